@@ -1,10 +1,11 @@
+import argparse
 import socket
 import struct
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 from enum import Enum, auto
 
 from Protocol import (
-    Protocol, Offer, Request, Card,
+    Protocol, Offer, Request, Card, card_str,
     RESULT_NOT_OVER, RESULT_WIN, RESULT_LOSS, RESULT_TIE
 )
 
@@ -24,21 +25,22 @@ def map_protocol_result(result: int) -> RoundResult:
     return RoundResult.ERROR
 
 UDP_OFFER_PORT = 13122
-SUITS = ['H', 'D', 'C', 'S']
+# every server frame has the same size
+_PAYLOAD_SERVER_SIZE = Protocol.server_payload_size()
 
 
-def recv_exact(conn: socket.socket, n: int) -> Optional[bytes]:
-    conn.settimeout(None)
+def recv_exact(conn: socket.socket, n: int, buf: Optional[bytearray] = None) -> Optional[bytearray]:
+    if buf is None:
+        buf = bytearray(n)
+    mv = memoryview(buf)
     got = 0
-    chunks = []
     try:
         while got < n:
-            chunk = conn.recv(n - got)
-            if not chunk:
+            k = conn.recv_into(mv[got:], n - got)
+            if not k:
                 return None
-            chunks.append(chunk)
-            got += len(chunk)
-        return b"".join(chunks)
+            got += k
+        return buf
     except (socket.timeout, OSError):
         return None
 
@@ -59,16 +61,50 @@ def listen_for_offer() -> Optional[Tuple[str, Offer]]:
 
 
 def cards_str(cards):
-    return " ".join(f"{c.rank}{SUITS[c.suit]}" for c in cards)
+    return " ".join(card_str(c) for c in cards)
 
 
-def play_round(conn: socket.socket, round_idx: int) -> RoundResult:
-    payload_size = Protocol.server_payload_size()
+# decide(player_total, dealer_up) -> "Hittt" / "Stand"
+Decider = Callable[[int, Card], str]
+
+
+def ask_decision(player_total: int, dealer_up: Card) -> str:
+    cmd = input("Hit or Stand? (h/s): ").strip().lower()
+    return "Stand" if cmd in ("s", "stand") else "Hittt"
+
+
+def basic_strategy(player_total: int, dealer_up: Card) -> str:
+    if player_total >= 17:
+        return "Stand"
+    if player_total <= 11:
+        return "Hittt"
+    # 12-16: stand against a weak dealer upcard, hit against a strong one
+    return "Stand" if 2 <= dealer_up.value <= 6 else "Hittt"
+
+
+def scripted_decisions(path: str) -> Decider:
+    # whitespace separated h/s tokens, consumed one per decision; basic strategy once they run out
+    with open(path, encoding="utf-8") as f:
+        script = ["Stand" if tok.lower() in ("s", "stand") else "Hittt" for tok in f.read().split()]
+    script.reverse()
+
+    def decide(player_total: int, dealer_up: Card) -> str:
+        if script:
+            return script.pop()
+        return basic_strategy(player_total, dealer_up)
+
+    return decide
+
+
+def play_round(conn: socket.socket, round_idx: int, decide: Decider = ask_decision) -> RoundResult:
+    payload_size = _PAYLOAD_SERVER_SIZE
+    # one buffer serves every frame of the round
+    buf = bytearray(payload_size)
     print(f"\n=== ROUND {round_idx} ===")
 
     init = []
     for _ in range(3):
-        raw = recv_exact(conn, payload_size)
+        raw = recv_exact(conn, payload_size, buf)
         if not raw:
             print("[TCP] Disconnected while receiving initial cards.")
             return RoundResult.ERROR
@@ -82,14 +118,12 @@ def play_round(conn: socket.socket, round_idx: int) -> RoundResult:
     player_cards = [init[0][1], init[1][1]]
     dealer_up = init[2][1]
 
-    print(f"Your cards: {cards_str(player_cards)} (total={sum(c.game_value() for c in player_cards)})")
-    print(f"Dealer up:  {dealer_up.rank}{SUITS[dealer_up.suit]}")
+    total = player_cards[0].value + player_cards[1].value
+    print(f"Your cards: {cards_str(player_cards)} (total={total})")
+    print(f"Dealer up:  {card_str(dealer_up)}")
 
     while True:
-        total = sum(c.game_value() for c in player_cards)
-
-        cmd = input("Hit or Stand? (h/s): ").strip().lower()
-        decision = "Stand" if cmd in ("s", "stand") else "Hittt"
+        decision = decide(total, dealer_up)
 
         try:
             conn.sendall(Protocol.build_payload_from_client(decision))
@@ -100,7 +134,7 @@ def play_round(conn: socket.socket, round_idx: int) -> RoundResult:
         if decision == "Stand":
             break
 
-        raw = recv_exact(conn, payload_size)
+        raw = recv_exact(conn, payload_size, buf)
         if not raw:
             print("[TCP] Disconnected while receiving hit card.")
             return RoundResult.ERROR
@@ -116,14 +150,14 @@ def play_round(conn: socket.socket, round_idx: int) -> RoundResult:
             return RoundResult.ERROR
 
         player_cards.append(card)
-        total = sum(c.game_value() for c in player_cards)
-        print(f"You got: {card.rank}{SUITS[card.suit]} (total={total})")
+        total += card.value
+        print(f"You got: {card_str(card)} (total={total})")
 
         if total > 21:
             break
 
     while True:
-        raw = recv_exact(conn, payload_size)
+        raw = recv_exact(conn, payload_size, buf)
         if not raw:
             print("[TCP] Disconnected while waiting for dealer/result.")
             return RoundResult.ERROR
@@ -134,7 +168,7 @@ def play_round(conn: socket.socket, round_idx: int) -> RoundResult:
 
         result, card = parsed
         if result == RESULT_NOT_OVER:
-            print(f"[Dealer] {card.rank}{SUITS[card.suit]}")
+            print(f"[Dealer] {card_str(card)}")
             continue
 
         rr = map_protocol_result(result)
@@ -149,7 +183,26 @@ def play_round(conn: socket.socket, round_idx: int) -> RoundResult:
         return rr
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Blackjack client")
+    parser.add_argument("--auto", action="store_true",
+                        help="play with a basic-strategy policy instead of prompting")
+    parser.add_argument("--decisions", metavar="FILE",
+                        help="read h/s decisions from FILE (implies --auto)")
+    parser.add_argument("--rounds", type=int, help="number of rounds, skips the prompt")
+    parser.add_argument("--name", help="client name, skips the prompt")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    if args.decisions:
+        decide = scripted_decisions(args.decisions)
+    elif args.auto:
+        decide = basic_strategy
+    else:
+        decide = ask_decision
+
     stats = {
     RoundResult.WIN: 0,
     RoundResult.LOSS: 0,
@@ -163,23 +216,28 @@ def main():
     conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     print(f"[TCP] Connecting to {server_ip}:{offer.server_tcp_port} ...")
     conn.connect((server_ip, offer.server_tcp_port))
+    # tiny request/response messages: don't let Nagle hold them back
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     print("[TCP] Connected.")
 
-    rounds_str = input("How many rounds? (1-255): ").strip() or "1"
-    try:
-        rounds = int(rounds_str)
-    except ValueError:
-        rounds = 1
+    if args.rounds is not None:
+        rounds = args.rounds
+    else:
+        rounds_str = input("How many rounds? (1-255): ").strip() or "1"
+        try:
+            rounds = int(rounds_str)
+        except ValueError:
+            rounds = 1
     rounds = max(1, min(rounds, 255))
 
-    name = input("Your client name: ").strip() or "ClientTeam"
+    name = args.name or input("Your client name: ").strip() or "ClientTeam"
     req = Request(rounds=rounds, client_name=name)
 
     conn.sendall(Protocol.build_request(req))
     # conn.sendall(b"\n")
 
     for i in range(1, rounds + 1):
-        res = play_round(conn, i)
+        res = play_round(conn, i, decide)
         stats[res] += 1
 
         if res == RoundResult.ERROR:
@@ -1,5 +1,5 @@
 import struct
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Tuple
 
 # --------------------------
@@ -11,6 +11,10 @@ MSG_OFFER   = 0x2
 MSG_REQUEST = 0x3
 MSG_PAYLOAD = 0x4
 
+# every frame starts with cookie(4) + type(1); checked with one bytes compare
+_OFFER_PREFIX   = struct.pack("!IB", MAGIC_COOKIE, MSG_OFFER)
+_PAYLOAD_PREFIX = struct.pack("!IB", MAGIC_COOKIE, MSG_PAYLOAD)
+
 # Results (server -> client)
 RESULT_NOT_OVER = 0x0
 RESULT_TIE      = 0x1
@@ -19,6 +23,9 @@ RESULT_WIN      = 0x3   # client won
 
 DECISION_SIZE = 5  # exactly 5 bytes: "Hittt" / "Stand"
 
+# rank -> blackjack value (ace counts 11, face cards 10)
+_CARD_VALUE = (10, 11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10)
+
 # --------------------------
 # Data objects
 # --------------------------
@@ -32,17 +39,31 @@ class Request:
     rounds: int
     client_name: str
 
-@dataclass
+@dataclass(slots=True)
 class Card:
     rank: int  # 1-13
     suit: int  # 0-3
+    value: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # looked up once, so hand totals are a plain attribute load
+        self.value = _CARD_VALUE[self.rank] if 0 <= self.rank <= 13 else 10
 
     def game_value(self) -> int:
-        if self.rank == 1:
-            return 11
-        if 2 <= self.rank <= 10:
-            return self.rank
-        return 10
+        return self.value
+
+
+SUITS = ['H', 'D', 'C', 'S']  # encoded 0-3
+
+# display strings, indexed by suit * 13 + rank - 1
+CARD_STRS = tuple(f"{r}{SUITS[s]}" for s in range(4) for r in range(1, 14))
+
+
+def card_str(card: Card) -> str:
+    if 1 <= card.rank <= 13:
+        return CARD_STRS[card.suit * 13 + card.rank - 1]
+    # out-of-range ranks can still arrive in a well-formed frame
+    return f"{card.rank}{SUITS[card.suit]}"
 
 
 class Protocol:
@@ -59,6 +80,12 @@ class Protocol:
     PAYLOAD_CLIENT_FMT = "!IB5s"   # 10 bytes
     PAYLOAD_SERVER_FMT = "!IBBhb"  # 8 bytes (result=1, rank=2, suit=1) signed כמו אצלך
 
+    # compiled once, reused for every message
+    _OFFER = struct.Struct(OFFER_FMT)
+    _REQUEST = struct.Struct(REQUEST_FMT)
+    _PAYLOAD_CLIENT = struct.Struct(PAYLOAD_CLIENT_FMT)
+    _PAYLOAD_SERVER = struct.Struct(PAYLOAD_SERVER_FMT)
+
     @staticmethod
     def _fix_name(name: str) -> bytes:
         b = name.encode("utf-8", errors="ignore")[:32]
@@ -71,19 +98,16 @@ class Protocol:
     # ---------- OFFER ----------
     @staticmethod
     def parse_offer(data: bytes) -> Optional[Offer]:
-        if len(data) != struct.calcsize(Protocol.OFFER_FMT):
-            return None
-        cookie, mtype, port, name = struct.unpack(Protocol.OFFER_FMT, data)
-        if cookie != MAGIC_COOKIE or mtype != MSG_OFFER:
+        if len(data) != Protocol._OFFER.size or not data.startswith(_OFFER_PREFIX):
             return None
+        _, _, port, name = Protocol._OFFER.unpack_from(data, 0)
         return Offer(server_tcp_port=int(port), server_name=Protocol._parse_name(name))
 
     # ---------- REQUEST ----------
     @staticmethod
     def build_request(req: Request) -> bytes:
         rounds = max(1, min(int(req.rounds), 255))
-        return struct.pack(
-            Protocol.REQUEST_FMT,
+        return Protocol._REQUEST.pack(
             MAGIC_COOKIE,
             MSG_REQUEST,
             rounds,
@@ -93,30 +117,43 @@ class Protocol:
     # ---------- PAYLOAD: client -> server ----------
     @staticmethod
     def build_payload_from_client(decision: str) -> bytes:
-        if decision not in ("Hittt", "Stand"):
+        frame = _CLIENT_FRAMES.get(decision)
+        if frame is None:
             raise ValueError("decision must be 'Hittt' or 'Stand'")
-        decision_bytes = decision.encode("ascii")  # exactly 5 bytes
-        return struct.pack(
-            Protocol.PAYLOAD_CLIENT_FMT,
-            MAGIC_COOKIE,
-            MSG_PAYLOAD,
-            decision_bytes
-        )
+        return frame
 
     # ---------- PAYLOAD: server -> client ----------
     @staticmethod
     def parse_payload_from_server(data: bytes) -> Optional[Tuple[int, Card]]:
-        if len(data) != struct.calcsize(Protocol.PAYLOAD_SERVER_FMT):
-            return None
-        cookie, mtype, result, rank, suit = struct.unpack(Protocol.PAYLOAD_SERVER_FMT, data)
-        if cookie != MAGIC_COOKIE or mtype != MSG_PAYLOAD:
+        frame = _SERVER_FRAMES.get(bytes(data))
+        if frame is not None:
+            return frame
+        if len(data) != Protocol._PAYLOAD_SERVER.size or not data.startswith(_PAYLOAD_PREFIX):
             return None
+        _, _, result, rank, suit = Protocol._PAYLOAD_SERVER.unpack_from(data, 0)
         return int(result), Card(rank=int(rank), suit=int(suit))
 
     @staticmethod
     def server_payload_size() -> int:
-        return struct.calcsize(Protocol.PAYLOAD_SERVER_FMT)
+        return Protocol._PAYLOAD_SERVER.size
 
     @staticmethod
     def client_payload_size() -> int:
-        return struct.calcsize(Protocol.PAYLOAD_CLIENT_FMT)
+        return Protocol._PAYLOAD_CLIENT.size
+
+
+# --------------------------
+# Prebuilt frames
+# --------------------------
+# Both decisions and every result/card frame a server can send, built once so the
+# per-card paths are a dict lookup instead of struct work. Cards in here are shared.
+_CLIENT_FRAMES = {
+    d: Protocol._PAYLOAD_CLIENT.pack(MAGIC_COOKIE, MSG_PAYLOAD, d.encode("ascii"))  # exactly 5 bytes
+    for d in ("Hittt", "Stand")
+}
+_SERVER_FRAMES = {
+    Protocol._PAYLOAD_SERVER.pack(MAGIC_COOKIE, MSG_PAYLOAD, result, rank, suit): (result, Card(rank=rank, suit=suit))
+    for result in (RESULT_NOT_OVER, RESULT_TIE, RESULT_LOSS, RESULT_WIN)
+    for suit in range(4)
+    for rank in range(1, 14)
+}
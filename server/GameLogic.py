@@ -1,3 +1,8 @@
+from typing import Iterable
+
+from Protocol import RESULT_TIE, RESULT_LOSS, RESULT_WIN
+
+
 class GameLogic:
     """
     Dealer rule for multi-player board:
@@ -5,22 +10,28 @@ class GameLogic:
     """
 
     @staticmethod
-    def dealer_should_hit(dealer_total: int, players_hands: dict) -> bool:
+    def best_player_total(players_totals: Iterable[int]) -> int:
+        """
+        :param players_totals: hand totals of the players in the round
+        :return: highest non-busted player total, 0 if every player busted
+        """
+        best_player = 0
+        for total in players_totals:
+            if total <= 21:
+                best_player = max(best_player, total)
+        return best_player
+
+    @staticmethod
+    def dealer_should_hit(dealer_total: int, best_player: int) -> bool:
         """
         :param dealer_total: current sum of dealer cards
-        :param players_hands: dict[conn -> List[Card]]
+        :param best_player: result of best_player_total, computed once per dealer turn
         :return: True if dealer should take another card
         """
 
         if dealer_total > 17:
             return False
 
-        best_player = 0
-        for hand in players_hands.values():
-            total = sum(c.game_value() for c in hand)
-            if total <= 21:
-                best_player = max(best_player, total)
-
         if best_player == 0:
             return False
 
@@ -34,4 +45,17 @@ def dealer_should_hit(dealer_total: int, player_total: int) -> bool:
     """
     if dealer_total > 17:
         return False
-    return dealer_total <= player_total
\ No newline at end of file
+    return dealer_total <= player_total
+
+
+def round_result(player_total: int, dealer_total: int) -> int:
+    """
+    Settle a finished hand for a player who did not bust.
+    Pure integer scoring shared by GameSession and OneBoard; returns
+    Protocol.RESULT_WIN / RESULT_LOSS / RESULT_TIE.
+    """
+    if dealer_total > 21 or player_total > dealer_total:
+        return RESULT_WIN
+    if dealer_total > player_total:
+        return RESULT_LOSS
+    return RESULT_TIE
@@ -1,23 +1,25 @@
 import Protocol, GameLogic
+import array
 import socket
-import struct
 import threading
 import time
 import random
 from dataclasses import dataclass
 from typing import Optional, Tuple, List
 from ServerMain import Offer
-from Protocol import Protocol, Card, Request
+from Protocol import (
+    Protocol, Card, Request, card_code, card_from_code, card_str, CARD_INTERN, HIT_FRAME, STAND_FRAME,
+    RESULT_NOT_OVER, RESULT_TIE, RESULT_LOSS, RESULT_WIN
+)
 import GameLogic
 
-# Round results (server -> client)
-RESULT_NOT_OVER = 0x0
-RESULT_TIE = 0x1
-RESULT_LOSS = 0x2   # client lost (dealer won)
-RESULT_WIN = 0x3    # client won (dealer lost)
-
-SUITS = ['H', 'D', 'C', 'S']  # encoded 0-3
 RANKS = list(range(1, 14))    # 1-13
+# filler card on result frames (rank 2, suit 0)
+_DUMMY_CARD = CARD_INTERN[1][0]
+
+# frame sizes never change, so compute them once
+_REQUEST_SIZE = Protocol.request_size()
+_PAYLOAD_CLIENT_SIZE = Protocol.client_payload_size()
 
 # --------------------------
 # Single game session
@@ -28,34 +30,77 @@ class GameSession:
         self.conn = conn
         self.addr = addr
         self.team_name = team_name
-
-    def _recv_exact(self, n: int) -> Optional[bytes]:
-        self.conn.settimeout(None)
-        chunks = []
+        # one deck for the whole session, reshuffled in place each round
+        self._deck = array.array("B", [card_code(r, s) for s in range(4) for r in range(1, 14)])
+        self._deck_pos = 0
+        # reused for every decision frame received from this client
+        self._recv_buf = bytearray(_PAYLOAD_CLIENT_SIZE)
+        # bytes read past a newline, served before reading the socket again
+        self._pending = bytearray()
+
+    def _recv_exact_into(self, buf: bytearray) -> Optional[bytearray]:
+        # fill the caller's buffer completely; returns it, or None on disconnect
+        n = len(buf)
+        mv = memoryview(buf)
         got = 0
+        if self._pending:
+            got = min(n, len(self._pending))
+            buf[:got] = self._pending[:got]
+            del self._pending[:got]
         try:
             while got < n:
-                chunk = self.conn.recv(n - got)
-                if not chunk:
+                k = self.conn.recv_into(mv[got:], n - got)
+                if not k:
                     return None
-                chunks.append(chunk)
-                got += len(chunk)
-            return b"".join(chunks)
+                got += k
+            return buf
         except socket.timeout:
             return None
         except OSError:
             return None
 
+    def _recv_request(self) -> Optional[bytearray]:
+        # room for the optional '\n', so the request and its newline come in with one recv_into
+        buf = bytearray(_REQUEST_SIZE + 1)
+        mv = memoryview(buf)
+        got = 0
+        try:
+            while got < _REQUEST_SIZE:
+                k = self.conn.recv_into(mv[got:])
+                if not k:
+                    return None
+                got += k
+        except OSError:
+            return None
+        if got > _REQUEST_SIZE and buf[_REQUEST_SIZE] != 0x0A:
+            # not a newline: it belongs to the next message
+            self._pending += mv[_REQUEST_SIZE:got]
+        mv.release()
+        del buf[_REQUEST_SIZE:]
+        return buf
+
     def _recv_until_newline(self, max_len: int = 128) -> Optional[bytes]:
-        self.conn.settimeout(None)
-        data = b""
+        buf = bytearray(max_len)
+        mv = memoryview(buf)
+        got = min(len(self._pending), max_len)
+        if got:
+            buf[:got] = self._pending[:got]
+            del self._pending[:got]
+        scanned = 0
         try:
-            while b"\n" not in data and len(data) < max_len:
-                chunk = self.conn.recv(1)
-                if not chunk:
+            while True:
+                # only look at bytes that arrived since the last scan
+                i = buf.find(b"\n", scanned, got)
+                if i != -1:
+                    self._pending[:0] = mv[i + 1:got]
+                    return bytes(mv[:i + 1])
+                if got >= max_len:
+                    return bytes(buf)
+                scanned = got
+                k = self.conn.recv_into(mv[got:], max_len - got)
+                if not k:
                     return None
-                data += chunk
-            return data
+                got += k
         except socket.timeout:
             return None
         except OSError:
@@ -68,24 +113,39 @@ class GameSession:
         except OSError:
             return False
 
-    def _new_shuffled_deck(self) -> List[Card]:
-        deck = [Card(rank=r, suit=s) for s in range(4) for r in range(1, 14)]
-        random.shuffle(deck)
-        return deck
-
-    def _draw(self, deck: List[Card]) -> Card:
-        return deck.pop()
+    def _send_payload(self, result: int, card: Card) -> bool:
+        # prebuilt frame from the Protocol table; one send() takes the whole thing,
+        # sendall only finishes a short write
+        frame = Protocol.build_payload_from_server(result, card)
+        try:
+            k = self.conn.send(frame)
+            if k < len(frame):
+                self.conn.sendall(frame[k:])
+            return True
+        except OSError:
+            return False
 
-    def _sum_cards(self, cards: List[Card]) -> int:
-        return sum(c.game_value() for c in cards)
+    def _shuffle_deck(self) -> None:
+        # the actual shuffling happens lazily in _draw
+        self._deck_pos = 0
+
+    def _draw(self) -> Card:
+        # one Fisher-Yates step per card: swap a random undrawn card into place.
+        # A round only uses a handful of cards, so this beats shuffling all 52 up front.
+        deck = self._deck
+        pos = self._deck_pos
+        j = random.randrange(pos, len(deck))
+        deck[pos], deck[j] = deck[j], deck[pos]
+        self._deck_pos = pos + 1
+        # deck holds packed card bytes; a Card is only built for cards actually drawn
+        return card_from_code(deck[pos])
 
     def play(self) -> None:
         print(f"[TCP] Client connected from {self.addr}")
 
         # Request message: client sends request over TCP followed by '\n' (spec says newline after rounds)
-        # We'll read fixed request size, then consume newline if present.
-        req_size = struct.calcsize(Protocol.REQUEST_FMT)
-        req_bytes = self._recv_exact(req_size)
+        # Read the fixed request size and the newline, if present, in one go.
+        req_bytes = self._recv_request()
         if not req_bytes:
             print("[TCP] Failed to read request (timeout/disconnect)")
             return
@@ -114,26 +174,23 @@ class GameSession:
         print(f"[DONE] {req.client_name}: rounds={rounds}, dealer_wins={wins_dealer}, client_wins={wins_client}, ties={ties}")
 
     def _play_single_round(self, round_idx: int, client_name: str) -> int:
-        deck = self._new_shuffled_deck()
+        self._shuffle_deck()
 
-        player = [self._draw(deck), self._draw(deck)]
-        dealer = [self._draw(deck), self._draw(deck)]
+        player = [self._draw(), self._draw()]
+        dealer = [self._draw(), self._draw()]
 
-        player_total = self._sum_cards(player)
+        player_total = player[0].value + player[1].value
         dealer_up = dealer[0]
-        # Send initial state (simplify by sending cards one by one)
-        player_cards_str = " ".join(f"{c.rank}{SUITS[c.suit]}" for c in player)
+        player_cards_str = " ".join(card_str(c) for c in player)
         
         print(
         f"[ROUND {round_idx} client='{client_name}]': "
         f"player={player_cards_str} (total={player_total}), "
-        f"dealer_up={dealer_up.rank}{SUITS[dealer_up.suit]}")
+        f"dealer_up={card_str(dealer_up)}")
 
-        # Send player's two cards + dealer upcard to client (as payload messages)
-        for c in player:
-            if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, c)):
-                return RESULT_TIE
-        if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, dealer_up)):
+        # Send player's two cards + dealer upcard to client in a single write
+        initial = b"".join(Protocol.build_payload_from_server(RESULT_NOT_OVER, c) for c in (player[0], player[1], dealer_up))
+        if not self._send(initial):
             return RESULT_TIE
 
         # Player turn
@@ -141,63 +198,53 @@ class GameSession:
             if player_total > 21:
                 print(f"[ROUND {round_idx} client='{client_name}] Player bust ({player_total}).")
                 # Send result (round over) - include dummy card
-                dummy = Card(rank=2, suit=0)
-                self._send(Protocol.build_payload_from_server(RESULT_LOSS, dummy))
+                self._send_payload(RESULT_LOSS, _DUMMY_CARD)
                 return RESULT_WIN
 
             # wait for client decision payload
-            data = self._recv_exact(Protocol.client_payload_size())
+            data = self._recv_exact_into(self._recv_buf)
             if not data:
                 print(f"[ROUND {round_idx} client='{client_name}] Client disconnected during decision.")
                 return RESULT_TIE
 
-            decision = Protocol.parse_payload_from_client(data)
-            if not decision:
-                print(f"[ROUND {round_idx} client='{client_name}] Invalid decision payload.")
-                return RESULT_TIE
-
-            if decision == "Stand":
+            # a valid frame is byte-for-byte one of two constants: compare, don't parse
+            if data == STAND_FRAME:
                 print(f"[ROUND {round_idx} client='{client_name}] Player stands at {player_total}")
                 break
+            if data != HIT_FRAME:
+                print(f"[ROUND {round_idx} client='{client_name}] Invalid decision payload.")
+                return RESULT_TIE
 
             # Hit
-            newc = self._draw(deck)
+            newc = self._draw()
             player.append(newc)
-            player_total = self._sum_cards(player)
-            print(f"[ROUND {round_idx} client='{client_name}] Player hit: +{newc.rank}{SUITS[newc.suit]} => {player_total}")
-            if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, newc)):
+            player_total += newc.value
+            print(f"[ROUND {round_idx} client='{client_name}] Player hit: +{card_str(newc)} => {player_total}")
+            if not self._send_payload(RESULT_NOT_OVER, newc):
                 return RESULT_TIE
 
         # Dealer turn (reveal hidden + hit till >=17)
         hidden = dealer[1]
-        dealer_total = self._sum_cards(dealer)
-        print(f"[ROUND {round_idx} client='{client_name}] Dealer reveals: {hidden.rank}{SUITS[hidden.suit]} => {dealer_total}")
-        if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, hidden)):
-            return RESULT_TIE
+        dealer_total = dealer[0].value + dealer[1].value
+        print(f"[ROUND {round_idx} client='{client_name}] Dealer reveals: {card_str(hidden)} => {dealer_total}")
+        # the dealer doesn't wait on the client, so reveal + hits + result go out in one write
+        dealer_out = [Protocol.build_payload_from_server(RESULT_NOT_OVER, hidden)]
 
         while GameLogic.dealer_should_hit(dealer_total, player_total):
-            newc = self._draw(deck)
+            newc = self._draw()
             dealer.append(newc)
-            dealer_total = self._sum_cards(dealer)
-            print(f"[ROUND {round_idx} client='{client_name}] Dealer hit: +{newc.rank}{SUITS[newc.suit]} => {dealer_total}")
-            if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, newc)):
-                return RESULT_TIE
+            dealer_total += newc.value
+            print(f"[ROUND {round_idx} client='{client_name}] Dealer hit: +{card_str(newc)} => {dealer_total}")
+            dealer_out.append(Protocol.build_payload_from_server(RESULT_NOT_OVER, newc))
 
         # Decide winner
+        result = GameLogic.round_result(player_total, dealer_total)
         if dealer_total > 21:
             print(f"[ROUND {round_idx} client='{client_name}] Dealer bust ({dealer_total}). Client wins.")
-            dummy = Card(rank=2, suit=0)
-            self._send(Protocol.build_payload_from_server(RESULT_WIN, dummy))
-            return RESULT_WIN
-
-        if player_total > dealer_total:
-            result = RESULT_WIN
-        elif dealer_total > player_total:
-            result = RESULT_LOSS
         else:
-            result = RESULT_TIE
+            print(f"[ROUND {round_idx} client='{client_name}] Final: player={player_total}, dealer={dealer_total}, result={result}")
 
-        print(f"[ROUND {round_idx} client='{client_name}] Final: player={player_total}, dealer={dealer_total}, result={result}")
-        dummy = Card(rank=2, suit=0)
-        self._send(Protocol.build_payload_from_server(result, dummy))
+        dealer_out.append(Protocol.build_payload_from_server(result, _DUMMY_CARD))
+        if not self._send(b"".join(dealer_out)):
+            return RESULT_TIE
         return result
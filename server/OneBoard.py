@@ -1,19 +1,29 @@
+import atexit
+import queue
+import selectors
 import socket
-import struct
+import sys
 import threading
+import time
 import random
-from dataclasses import dataclass
-from typing import Optional, Dict, List
+from dataclasses import dataclass, field
+from typing import Optional, List, Set, Tuple
 
-from Protocol import Protocol, Card
+from Protocol import (
+    Protocol, _REQUEST_PREFIX, card_str, card_code, card_from_code, CARD_INTERN, CODE_VALUES,
+    RESULT_NOT_OVER, RESULT_TIE, RESULT_LOSS, RESULT_WIN
+)
 import GameLogic
 
-RESULT_NOT_OVER = 0x0
-RESULT_TIE = 0x1
-RESULT_LOSS = 0x2   # client lost (dealer won)
-RESULT_WIN = 0x3    # client won (dealer lost)
+# filler card on result frames (rank 2, suit 0)
+_DUMMY_CARD = CARD_INTERN[1][0]
 
-SUITS = ['H', 'D', 'C', 'S']
+# Seconds a player gets for each decision; None waits forever (people play interactively).
+# The protocol can't tell a client it was stood, so a player who runs out of time is dropped.
+DECISION_TIMEOUT_SEC: Optional[float] = None
+
+_REQUEST_SIZE = Protocol.request_size()
+_PAYLOAD_CLIENT_SIZE = Protocol.client_payload_size()
 
 
 @dataclass
@@ -23,38 +33,99 @@ class RoundResults:
     ties: int = 0
 
 
+@dataclass(eq=False, slots=True)
+class ClientState:
+    # one per joined player, stored at self._slots[slot]; identity-hashed (eq=False)
+    slot: int
+    conn: socket.socket
+    name: str
+    remaining: int
+    stats: RoundResults = field(default_factory=RoundResults)
+    # current round: hand as card codes, its running total, partial decision frame
+    hand: bytearray = field(default_factory=bytearray)
+    total: int = 0
+    pending: bytearray = field(default_factory=bytearray)
+    # monotonic time the current decision is due by (only with DECISION_TIMEOUT_SEC)
+    deadline: float = 0.0
+
+
 class OneBoard:
     def __init__(self, team_name: str):
         self.team_name = team_name
 
-        self.deck: List[Card] = self._new_shuffled_deck()
+        # packed card codes (see Protocol.card_code); Card objects only exist at the protocol boundary.
+        # One 52-byte deck is reused for every shoe: deck[:_deck_pos] is already dealt.
+        self.deck: bytearray = bytearray(card_code(r, s) for s in range(4) for r in range(1, 14))
+        self._deck_pos = 0
 
-        # conn -> remaining rounds
-        self.remaining_rounds: Dict[socket.socket, int] = {}
+        # slot id -> player, None for a free slot; freed ids are reused by later joiners
+        self._slots: List[Optional[ClientState]] = []
+        self._free_slots: List[int] = []
 
-        # conn -> stats
-        self.stats: Dict[socket.socket, RoundResults] = {}
+        # The game thread owns the slots above. Joiners are handed over through this
+        # queue and the condition only wakes the game thread while it has no players.
+        self._joins: queue.SimpleQueue = queue.SimpleQueue()
+        self.cond = threading.Condition()
 
-        # conn -> client_name
-        self.player_name: Dict[socket.socket, str] = {}
+        # player turns run concurrently: the game thread waits on all active sockets at once
+        self._selector = selectors.DefaultSelector()
 
-        self.cond = threading.Condition()
+        # Log lines are formatted on the calling thread but written by a background thread,
+        # so the game loop never blocks on stdout. Whatever is still queued at exit is flushed.
+        self._log_q: queue.SimpleQueue = queue.SimpleQueue()
+        self._log_thread = threading.Thread(target=self._log_writer, daemon=True)
+        self._log_thread.start()
+        atexit.register(self._flush_log)
+
+    # ---------- logging ----------
+    def log(self, msg: str) -> None:
+        # everything printed about this board goes through here, so lines stay in order
+        self._log_q.put(msg + "\n")
+
+    def _log_writer(self) -> None:
+        # block for one line, then write out everything queued behind it with one flush;
+        # None (from _flush_log) ends the thread once the lines before it are written
+        while True:
+            lines = [self._log_q.get()]
+            while lines[-1] is not None:
+                try:
+                    lines.append(self._log_q.get_nowait())
+                except queue.Empty:
+                    break
+            done = lines[-1] is None
+            if done:
+                lines.pop()
+            try:
+                sys.stdout.write("".join(lines))
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass
+            if done:
+                return
+
+    def _flush_log(self) -> None:
+        self._log_q.put(None)
+        self._log_thread.join(timeout=2.0)
 
     # ---------- network helpers ----------
-    def _recv_exact(self, n: int, conn: socket.socket) -> Optional[bytes]:
-        conn.settimeout(None)  # interactive
-        chunks = []
-        got = 0
+    def _recv_exact_into(self, buf: bytearray, conn: socket.socket) -> bool:
+        # fill buf completely; the kernel writes straight into it, a small frame is normally one recv_into
+        n = len(buf)
         try:
+            got = conn.recv_into(buf, n)
+            if got == n:
+                return True
+            if not got:
+                return False
+            mv = memoryview(buf)
             while got < n:
-                chunk = conn.recv(n - got)
-                if not chunk:
-                    return None
-                chunks.append(chunk)
-                got += len(chunk)
-            return b"".join(chunks)
+                k = conn.recv_into(mv[got:], n - got)
+                if not k:
+                    return False
+                got += k
+            return True
         except OSError:
-            return None
+            return False
 
     def _send(self, data: bytes, conn: socket.socket) -> bool:
         try:
@@ -63,208 +134,278 @@ class OneBoard:
         except OSError:
             return False
 
-    # ---------- cards ----------
-    def _new_shuffled_deck(self) -> List[Card]:
-        deck = [Card(rank=r, suit=s) for s in range(4) for r in range(1, 14)]
-        random.shuffle(deck)
-        return deck
+    def _send_small(self, data: bytes, conn: socket.socket) -> bool:
+        # single frames: one send() takes the whole thing, sendall only finishes a short write
+        try:
+            k = conn.send(data)
+            if k < len(data):
+                conn.sendall(data[k:])
+            return True
+        except OSError:
+            return False
 
+    # ---------- cards ----------
     def _ensure_deck(self, needed: int) -> None:
-        if len(self.deck) < needed:
-            self.deck = self._new_shuffled_deck()
+        # new shoe: the same buffer is shuffled lazily again by _draw
+        if len(self.deck) - self._deck_pos < needed:
+            self._deck_pos = 0
 
-    def _draw(self) -> Card:
+    def _draw(self) -> int:
+        # one Fisher-Yates step per card, same as GameSession._draw
         self._ensure_deck(1)
-        return self.deck.pop()
+        deck = self.deck
+        pos = self._deck_pos
+        j = random.randrange(pos, len(deck))
+        deck[pos], deck[j] = deck[j], deck[pos]
+        self._deck_pos = pos + 1
+        return deck[pos]
 
-    def _sum_cards(self, cards: List[Card]) -> int:
-        return sum(c.game_value() for c in cards)
+    def _sum_cards(self, hand: bytearray) -> int:
+        return sum(hand.translate(CODE_VALUES))
 
     # ---------- player management ----------
-    def add_player(self, conn: socket.socket) -> None:
-        req_size = struct.calcsize(Protocol.REQUEST_FMT)
-        req_bytes = self._recv_exact(req_size, conn)
-        if not req_bytes:
-            print("[TCP] Failed to read request (disconnect)")
+    def add_player(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
+        # read and decode in place: the size is fixed by the buffer, so only the header needs checking
+        buf = bytearray(_REQUEST_SIZE)
+        if not self._recv_exact_into(buf, conn):
+            self.log("[TCP] Failed to read request (disconnect)")
             return
 
-        req = Protocol.parse_request(req_bytes)
-        if not req:
-            print("[TCP] Invalid request format")
+        if not buf.startswith(_REQUEST_PREFIX):
+            self.log("[TCP] Invalid request format")
             return
+        _, _, req_rounds, req_name = Protocol._REQUEST.unpack_from(buf, 0)
 
-        rounds = max(1, min(req.rounds, 255))
-        name = req.client_name or "client"
+        rounds = max(1, min(req_rounds, 255))
+        name = Protocol._parse_name(req_name) or "client"
 
+        self.log(f"[TCP] Client '{name}' joined from {addr} for {rounds} rounds")
+        self._joins.put((conn, name, rounds))
         with self.cond:
-            self.remaining_rounds[conn] = rounds
-            self.stats[conn] = RoundResults()
-            self.player_name[conn] = name
-            print(f"[TCP] Client '{name}' joined from {conn.getpeername()} for {rounds} rounds")
-            self.cond.notify_all()
-
-    def _drop_player(self, conn: socket.socket, reason: str) -> None:
-        name = self.player_name.get(conn, "client")
-        print(f"[TCP] Dropping client '{name}' ({reason})")
+            self.cond.notify()
+
+    def _admit_joiners(self) -> None:
+        # game thread only: move queued joiners into the round bookkeeping
+        while True:
+            try:
+                conn, name, rounds = self._joins.get_nowait()
+            except queue.Empty:
+                return
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._slots[slot] = ClientState(slot, conn, name, rounds)
+            else:
+                slot = len(self._slots)
+                self._slots.append(ClientState(slot, conn, name, rounds))
+
+    def _drop_player(self, p: ClientState, reason: str) -> None:
+        self.log(f"[TCP] Dropping client '{p.name}' ({reason})")
         try:
-            conn.close()
+            p.conn.close()
         except OSError:
             pass
-        self.remaining_rounds.pop(conn, None)
-        self.stats.pop(conn, None)
-        self.player_name.pop(conn, None)
+        if self._slots[p.slot] is p:
+            self._slots[p.slot] = None
+            self._free_slots.append(p.slot)
+
+    def _has_players(self) -> bool:
+        return len(self._free_slots) < len(self._slots)
+
+    def _is_seated(self, p: ClientState) -> bool:
+        # slots are only reused when joiners are admitted, so within a round this means "not dropped"
+        return self._slots[p.slot] is p
 
     # ---------- protocol actions ----------
-    def _get_decision(self, conn: socket.socket) -> Optional[str]:
-        data = self._recv_exact(Protocol.client_payload_size(), conn)
-        if not data:
-            return None
-        return Protocol.parse_payload_from_client(data)
-
-    def _send_initial_hands(self, players_hands: Dict[socket.socket, List[Card]], dealer_up: Card) -> None:
-        for conn, hand in players_hands.items():
-            # 2 קלפים לשחקן + קלף גלוי של דילר
-            for c in hand:
-                if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, c), conn):
-                    self._drop_player(conn, "send failed (player card)")
-                    continue
-            if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, dealer_up), conn):
-                self._drop_player(conn, "send failed (dealer upcard)")
+    def _send_initial_hands(self, players: List[ClientState], dealer_up: int) -> None:
+        up_payload = Protocol.build_payload_from_server(RESULT_NOT_OVER, card_from_code(dealer_up))
+        for p in players:
+            # 2 קלפים לשחקן + קלף גלוי של דילר, in one write
+            data = b"".join(Protocol.build_payload_from_server(RESULT_NOT_OVER, card_from_code(c)) for c in p.hand) + up_payload
+            if not self._send(data, p.conn):
+                self._drop_player(p, "send failed (initial hand)")
+
+    def _play_turns(self, active: Set[ClientState]) -> None:
+        # Every active player plays their turn at the same time. Sockets stay blocking; recv
+        # is only called once the selector says a socket is readable, so it never waits.
+        # Partial decision frames are kept on each player (ClientState.pending).
+        sel = self._selector
+        timeout = DECISION_TIMEOUT_SEC
+        now = time.monotonic()
+        for p in active:
+            p.pending.clear()
+            if timeout is not None:
+                p.deadline = now + timeout
+            sel.register(p.conn, selectors.EVENT_READ, p)
+
+        try:
+            while sel.get_map():
+                wait = None
+                if timeout is not None:
+                    now = time.monotonic()
+                    for key in list(sel.get_map().values()):
+                        p = key.data
+                        if p.deadline <= now:
+                            sel.unregister(p.conn)
+                            self._drop_player(p, "no decision in time")
+                            active.discard(p)
+                    if not sel.get_map():
+                        break
+                    wait = min(key.data.deadline for key in sel.get_map().values()) - now
+
+                for key, _ in sel.select(wait):
+                    p = key.data
+                    buf = p.pending
+                    try:
+                        chunk = p.conn.recv(_PAYLOAD_CLIENT_SIZE - len(buf))
+                    except OSError:
+                        chunk = b""
+                    if not chunk:
+                        sel.unregister(p.conn)
+                        self._drop_player(p, "disconnect during decision")
+                        active.discard(p)
+                        continue
+                    buf += chunk
+                    if len(buf) < _PAYLOAD_CLIENT_SIZE:
+                        continue
+
+                    decision = Protocol.parse_payload_from_client(buf)
+                    buf.clear()
+                    if not self._apply_decision(p, decision, active):
+                        sel.unregister(p.conn)
+                    elif timeout is not None:
+                        # the clock for the next decision starts once the hit card is out
+                        p.deadline = time.monotonic() + timeout
+        finally:
+            # a failure mid-turn must not leave sockets registered for the next round
+            for key in list(sel.get_map().values()):
+                sel.unregister(key.fileobj)
+
+    def _apply_decision(self, p: ClientState, decision: Optional[str], active: Set[ClientState]) -> bool:
+        # returns True while the player's turn goes on
+        if decision is None:
+            self._drop_player(p, "invalid decision")
+            active.discard(p)
+            return False
+
+        if decision == "Stand":
+            self.log(f"[client='{p.name}'] stand ({p.total})")
+            return False
+
+        # Hittt
+        code = self._draw()
+        newc = card_from_code(code)
+        p.total += newc.value
+        p.hand.append(code)
+        self.log(f"[client='{p.name}'] hit +{card_str(newc)} => {p.total}")
+
+        if not self._send_small(Protocol.build_payload_from_server(RESULT_NOT_OVER, newc), p.conn):
+            self._drop_player(p, "send failed (hit card)")
+            active.discard(p)
+            return False
+
+        if p.total > 21:
+            # player bust -> immediate LOSS
+            self.log(f"[client='{p.name}'] bust ({p.total})")
+            self._send_small(Protocol.build_payload_from_server(RESULT_LOSS, _DUMMY_CARD), p.conn)
+            p.stats.dealer_wins += 1
+            active.discard(p)
+            return False
+        return True
 
     # ---------- main game loop ----------
     def play_forever(self) -> None:
-        print("[GAME] OneBoard starting...")
+        self.log("[GAME] OneBoard starting...")
 
         while True:
+            self._admit_joiners()
+
             # wait for at least one player
-            with self.cond:
-                while len(self.remaining_rounds) == 0:
-                    print("[GAME] Waiting for players...")
-                    self.cond.wait()
+            if not self._has_players():
+                with self.cond:
+                    while self._joins.empty():
+                        self.log("[GAME] Waiting for players...")
+                        self.cond.wait()
+                continue
 
-                # snapshot players for this round (so add_player can run concurrently)
-                conns = [c for c, r in self.remaining_rounds.items() if r > 0]
+            players = [p for p in self._slots if p and p.remaining > 0]
 
-            if not conns:
+            if not players:
                 continue
 
             # need: 2 per player + 2 dealer + (dealer hits up to ~10 worst case) + some player hits
-            self._ensure_deck(2 * len(conns) + 2 + 20)
+            self._ensure_deck(2 * len(players) + 2 + 20)
 
-            # deal initial hands
-            players_hands: Dict[socket.socket, List[Card]] = {c: [self._draw(), self._draw()] for c in conns}
-            dealer_hand: List[Card] = [self._draw(), self._draw()]
+            # deal initial hands; totals are kept running, updated per hit instead of re-summing hands
+            for p in players:
+                p.hand[:] = (self._draw(), self._draw())
+                p.total = self._sum_cards(p.hand)
+            dealer_hand = bytearray((self._draw(), self._draw()))
             dealer_up = dealer_hand[0]
             dealer_hidden = dealer_hand[1]
 
-            print(f"\n[GAME] New round with {len(conns)} players. Dealer up={dealer_up.rank}{SUITS[dealer_up.suit]}")
+            self.log(f"\n[GAME] New round with {len(players)} players. Dealer up={card_str(card_from_code(dealer_up))}")
 
             # decrement rounds for participants of this round
-            with self.cond:
-                for c in conns:
-                    if c in self.remaining_rounds:
-                        self.remaining_rounds[c] -= 1
+            for p in players:
+                p.remaining -= 1
 
             # send initial hands
-            self._send_initial_hands(players_hands, dealer_up)
+            self._send_initial_hands(players, dealer_up)
 
             # active players still in the round (not busted / not disconnected)
-            active = list(conns)
-
-            # ----- each player turn -----
-            for conn in list(active):
-                name = self.player_name.get(conn, "client")
+            # a set: players drop out mid-round, and discard is O(1) and safe to repeat
+            active: Set[ClientState] = {p for p in players if self._is_seated(p)}
 
-                while True:
-                    total = self._sum_cards(players_hands[conn])
+            # ----- player turns -----
+            self._play_turns(active)
 
-                    decision = self._get_decision(conn)
-                    if decision is None:
-                        self._drop_player(conn, "disconnect during decision")
-                        if conn in active:
-                            active.remove(conn)
-                        break
-
-                    if decision == "Stand":
-                        print(f"[client='{name}'] stand ({total})")
-                        break
-
-                    # Hittt
-                    newc = self._draw()
-                    total += newc.game_value()
-                    players_hands[conn].append(newc)
-                    print(f"[client='{name}'] hit +{newc.rank}{SUITS[newc.suit]} => {self._sum_cards(players_hands[conn])}")
-
-                    if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, newc), conn):
-                        self._drop_player(conn, "send failed (hit card)")
-                        if conn in active:
-                            active.remove(conn)
-                        break
-                    
-                    if total > 21:
-                        # player bust -> immediate LOSS
-                        print(f"[client='{name}'] bust ({total})")
-                        dummy = Card(rank=2, suit=0)
-                        self._send(Protocol.build_payload_from_server(RESULT_LOSS, dummy), conn)
-                        with self.cond:
-                            if conn in self.stats:
-                                self.stats[conn].dealer_wins += 1
-                        active.remove(conn)
-                        break
             # ----- dealer turn -----
-            # reveal hidden card to everyone still active
-            for conn in list(active):
-                if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, dealer_hidden), conn):
-                    self._drop_player(conn, "send failed (dealer reveal)")
-                    active.remove(conn)
-
-            dealer_total = self._sum_cards(dealer_hand)
-            print(f"[DEALER] reveal {dealer_hidden.rank}{SUITS[dealer_hidden.suit]} => {dealer_total}")
-
-            while GameLogic.GameLogic.dealer_should_hit(dealer_total, players_hands):
-                newc = self._draw()
-                dealer_hand.append(newc)
-                dealer_total = self._sum_cards(dealer_hand)
-                print(f"[DEALER] hit +{newc.rank}{SUITS[newc.suit]} => {dealer_total}")
-
-                for conn in list(active):
-                    if not self._send(Protocol.build_payload_from_server(RESULT_NOT_OVER, newc), conn):
-                        self._drop_player(conn, "send failed (dealer hit)")
-                        active.remove(conn)
+            # The dealer's turn needs no input from the players, so it is played out first and
+            # each player then gets the reveal, every dealer hit and their result in one write.
+            dealer_total = CODE_VALUES[dealer_up] + CODE_VALUES[dealer_hidden]
+            self.log(f"[DEALER] reveal {card_str(card_from_code(dealer_hidden))} => {dealer_total}")
+            dealer_frames = [Protocol.build_payload_from_server(RESULT_NOT_OVER, card_from_code(dealer_hidden))]
+
+            # player hands are fixed during the dealer turn
+            best_player = GameLogic.GameLogic.best_player_total(p.total for p in players)
+            while GameLogic.GameLogic.dealer_should_hit(dealer_total, best_player):
+                code = self._draw()
+                newc = card_from_code(code)
+                dealer_hand.append(code)
+                dealer_total += newc.value
+                self.log(f"[DEALER] hit +{card_str(newc)} => {dealer_total}")
+                dealer_frames.append(Protocol.build_payload_from_server(RESULT_NOT_OVER, newc))
+
+            # Same dealer sequence for everyone, and only three ways to end it: build each
+            # complete write once, so a player's send is a lookup by result.
+            dealer_seq = b"".join(dealer_frames)
+            round_ends = {
+                result: dealer_seq + Protocol.build_payload_from_server(result, _DUMMY_CARD)
+                for result in (RESULT_TIE, RESULT_LOSS, RESULT_WIN)
+            }
 
             # ----- decide winners for active players -----
-            for conn in list(active):
-                name = self.player_name.get(conn, "client")
-                player_total = self._sum_cards(players_hands[conn])
-
-                if dealer_total > 21:
-                    result = RESULT_WIN
-                elif player_total > dealer_total:
-                    result = RESULT_WIN
-                elif dealer_total > player_total:
-                    result = RESULT_LOSS
-                else:
-                    result = RESULT_TIE
+            for p in tuple(active):
+                player_total = p.total
+                result = GameLogic.round_result(player_total, dealer_total)
 
-                dummy = Card(rank=2, suit=0)
-                self._send(Protocol.build_payload_from_server(result, dummy), conn)
+                if not self._send(round_ends[result], p.conn):
+                    self._drop_player(p, "send failed (dealer turn)")
+                    active.discard(p)
+                    continue
 
-                with self.cond:
-                    if conn in self.stats:
-                        if result == RESULT_WIN:
-                            self.stats[conn].client_wins += 1
-                        elif result == RESULT_LOSS:
-                            self.stats[conn].dealer_wins += 1
-                        else:
-                            self.stats[conn].ties += 1
+                if result == RESULT_WIN:
+                    p.stats.client_wins += 1
+                elif result == RESULT_LOSS:
+                    p.stats.dealer_wins += 1
+                else:
+                    p.stats.ties += 1
 
-                print(f"[client='{name}'] final player={player_total} dealer={dealer_total} => {result}")
+                self.log(f"[client='{p.name}'] final player={player_total} dealer={dealer_total} => {result}")
 
             # ----- clean up finished players -----
-            with self.cond:
-                finished = [c for c, r in self.remaining_rounds.items() if r <= 0]
-            for c in finished:
-                name = self.player_name.get(c, "client")
-                st = self.stats.get(c, RoundResults())
-                print(f"[DONE] client='{name}' stats: W={st.client_wins} L={st.dealer_wins} T={st.ties}")
-                self._drop_player(c, "finished rounds")
+            finished = [p for p in self._slots if p and p.remaining <= 0]
+            for p in finished:
+                st = p.stats
+                self.log(f"[DONE] client='{p.name}' stats: W={st.client_wins} L={st.dealer_wins} T={st.ties}")
+                self._drop_player(p, "finished rounds")
@@ -1,5 +1,5 @@
 import struct
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 # --------------------------
@@ -12,8 +12,20 @@ MSG_OFFER = 0x2
 MSG_REQUEST = 0x3
 MSG_PAYLOAD = 0x4
 
+# Results (server -> client); the game modules all import these from here
+RESULT_NOT_OVER = 0x0
+RESULT_TIE = 0x1
+RESULT_LOSS = 0x2   # client lost (dealer won)
+RESULT_WIN = 0x3    # client won (dealer lost)
+
+# every frame starts with cookie(4) + type(1); checked with one bytes compare
+_REQUEST_PREFIX = struct.pack("!IB", MAGIC_COOKIE, MSG_REQUEST)
+
 DECISION_SIZE = 5  # "Hittt" / "Stand"
 
+# rank -> blackjack value (ace counts 11, face cards 10)
+_CARD_VALUE = (10, 11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10)
+
 
 @dataclass
 class Offer:
@@ -27,17 +39,50 @@ class Request:
     client_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Card:
     rank: int  # 1-10
     suit: int  # 0-3
+    value: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # looked up once, so hand totals are a plain attribute load
+        self.value = _CARD_VALUE[self.rank] if 0 <= self.rank <= 13 else 10
 
     def game_value(self) -> int:
-        if self.rank == 1:
-            return 11
-        if 2 <= self.rank <= 10:
-            return self.rank
-        return 10
+        return self.value
+
+
+SUITS = ['H', 'D', 'C', 'S']  # encoded 0-3
+
+# display strings, indexed by suit * 13 + rank - 1
+CARD_STRS = tuple(f"{r}{SUITS[s]}" for s in range(4) for r in range(1, 14))
+
+
+def card_str(card: Card) -> str:
+    if 1 <= card.rank <= 13:
+        return CARD_STRS[card.suit * 13 + card.rank - 1]
+    # out-of-range ranks can still arrive in a well-formed frame
+    return f"{card.rank}{SUITS[card.suit]}"
+
+
+# Compact card encoding for decks: one byte, suit in the high nibble, rank in the low
+def card_code(rank: int, suit: int) -> int:
+    return (suit << 4) | rank
+
+
+# only 52 distinct cards exist: build each once and share it (never mutate these).
+# CARD_INTERN[rank - 1][suit]
+CARD_INTERN = tuple(tuple(Card(rank=r, suit=s) for s in range(4)) for r in range(1, 14))
+
+
+def card_from_code(code: int) -> Card:
+    return CARD_INTERN[(code & 0x0F) - 1][code >> 4]
+
+
+# code -> blackjack value for every possible byte, so a hand kept as a bytearray of
+# codes is totalled with sum(hand.translate(CODE_VALUES)) entirely in C
+CODE_VALUES = bytes(_CARD_VALUE[c & 0x0F] if (c & 0x0F) <= 13 else 10 for c in range(256))
 
 
 class Protocol:
@@ -57,21 +102,27 @@ class Protocol:
     PAYLOAD_CLIENT_FMT = "!IB5s"   # 10 bytes: decision only
     PAYLOAD_SERVER_FMT = "!IBBhb"  # 8 bytes: result + rank + suit (signed like you used)
 
+    # compiled once, reused for every message
+    _OFFER = struct.Struct(OFFER_FMT)
+    _REQUEST = struct.Struct(REQUEST_FMT)
+    _PAYLOAD_CLIENT = struct.Struct(PAYLOAD_CLIENT_FMT)
+    _PAYLOAD_SERVER = struct.Struct(PAYLOAD_SERVER_FMT)
+
     @staticmethod
     def offer_size() -> int:
-        return struct.calcsize(Protocol.OFFER_FMT)
+        return Protocol._OFFER.size
 
     @staticmethod
     def request_size() -> int:
-        return struct.calcsize(Protocol.REQUEST_FMT)
+        return Protocol._REQUEST.size
 
     @staticmethod
     def client_payload_size() -> int:
-        return struct.calcsize(Protocol.PAYLOAD_CLIENT_FMT)
+        return Protocol._PAYLOAD_CLIENT.size
 
     @staticmethod
     def server_payload_size() -> int:
-        return struct.calcsize(Protocol.PAYLOAD_SERVER_FMT)
+        return Protocol._PAYLOAD_SERVER.size
 
     @staticmethod
     def _fix_name(name: str) -> bytes:
@@ -85,30 +136,28 @@ class Protocol:
     # ---------- OFFER ----------
     @staticmethod
     def build_offer(offer: Offer) -> bytes:
-        return struct.pack(
-            Protocol.OFFER_FMT,
-            MAGIC_COOKIE,
-            MSG_OFFER,
-            offer.server_tcp_port,
-            Protocol._fix_name(offer.server_name),
-        )
+        return Protocol.build_offer_bytes(offer.server_tcp_port, Protocol._fix_name(offer.server_name))
+
+    @staticmethod
+    def build_offer_bytes(tcp_port: int, name_b32: bytes) -> bytes:
+        # name_b32 is already padded by _fix_name, so nothing is encoded here
+        return Protocol._OFFER.pack(MAGIC_COOKIE, MSG_OFFER, tcp_port, name_b32)
 
     # ---------- REQUEST ----------
     @staticmethod
     def parse_request(data: bytes) -> Optional[Request]:
-        if len(data) != struct.calcsize(Protocol.REQUEST_FMT):
-            return None
-        cookie, mtype, rounds, name = struct.unpack(Protocol.REQUEST_FMT, data)
-        if cookie != MAGIC_COOKIE or mtype != MSG_REQUEST:
+        if len(data) != Protocol._REQUEST.size or not data.startswith(_REQUEST_PREFIX):
             return None
+        _, _, rounds, name = Protocol._REQUEST.unpack_from(data, 0)
         return Request(rounds=int(rounds), client_name=Protocol._parse_name(name))
 
     # ---------- PAYLOAD: server -> client ----------
     @staticmethod
     def build_payload_from_server(result: int, card: Card) -> bytes:
-        # 8 bytes only
-        return struct.pack(
-            Protocol.PAYLOAD_SERVER_FMT,
+        # 8 bytes only; real cards come prebuilt from _SERVER_FRAMES
+        if 0 <= result <= 3 and 1 <= card.rank <= 13 and 0 <= card.suit <= 3:
+            return _SERVER_FRAMES[result][card.suit * 13 + card.rank - 1]
+        return Protocol._PAYLOAD_SERVER.pack(
             MAGIC_COOKIE,
             MSG_PAYLOAD,
             int(result) & 0xFF,
@@ -119,14 +168,25 @@ class Protocol:
     # ---------- PAYLOAD: client -> server ----------
     @staticmethod
     def parse_payload_from_client(data: bytes) -> Optional[str]:
-        # Expect exactly 10 bytes
-        if len(data) != struct.calcsize(Protocol.PAYLOAD_CLIENT_FMT):
-            return None
-        cookie, mtype, decision_raw = struct.unpack(Protocol.PAYLOAD_CLIENT_FMT, data)
-        if cookie != MAGIC_COOKIE or mtype != MSG_PAYLOAD:
-            return None
+        # only two valid 10-byte frames exist, so one lookup validates and decodes
+        return _CLIENT_DECISIONS.get(bytes(data))
 
-        decision = decision_raw.decode("utf-8", errors="ignore")
-        if decision not in ("Hittt", "Stand"):
-            return None
-        return decision
+
+# --------------------------
+# Prebuilt frames
+# --------------------------
+# the only two valid client frames; hot loops compare against these directly
+HIT_FRAME = Protocol._PAYLOAD_CLIENT.pack(MAGIC_COOKIE, MSG_PAYLOAD, b"Hittt")
+STAND_FRAME = Protocol._PAYLOAD_CLIENT.pack(MAGIC_COOKIE, MSG_PAYLOAD, b"Stand")
+
+_CLIENT_DECISIONS = {HIT_FRAME: "Hittt", STAND_FRAME: "Stand"}
+
+# _SERVER_FRAMES[result][suit * 13 + rank - 1]: every result/card frame, packed once
+_SERVER_FRAMES = tuple(
+    tuple(
+        Protocol._PAYLOAD_SERVER.pack(MAGIC_COOKIE, MSG_PAYLOAD, result, rank, suit)
+        for suit in range(4)
+        for rank in range(1, 14)
+    )
+    for result in range(4)
+)
@@ -1,7 +1,8 @@
+import os
 import socket
 import threading
 from dataclasses import dataclass
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 import Protocol
 import GameSession
@@ -9,6 +10,8 @@ import OneBoard
 
 UDP_OFFER_PORT = 13122
 OFFER_INTERVAL_SEC = 1.0
+# one listener + accept thread per core when the kernel can share the port (SO_REUSEPORT)
+ACCEPT_WORKERS = os.cpu_count() or 1
 
 
 @dataclass
@@ -27,23 +30,25 @@ def get_local_ip() -> str:
 
 
 class OfferBroadcaster(threading.Thread):
-    def __init__(self, server_tcp_port: int, server_name: str, stop_event: threading.Event):
+    def __init__(self, server_tcp_port: int, server_name_b32: bytes, stop_event: threading.Event):
         super().__init__(daemon=True)
         self.server_tcp_port = server_tcp_port
-        self.server_name = server_name
+        self.server_name_b32 = server_name_b32
         self.stop_event = stop_event
 
     def run(self) -> None:
-        msg = Protocol.Protocol.build_offer(Offer(self.server_tcp_port, self.server_name))
+        msg = Protocol.Protocol.build_offer_bytes(self.server_tcp_port, self.server_name_b32)
 
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
+        # one datagram per tick: packet and destination are fixed, so build them once
+        dest = ("<broadcast>", UDP_OFFER_PORT)
         try:
             while not self.stop_event.is_set():
                 try:
-                    s.sendto(msg, ("<broadcast>", UDP_OFFER_PORT))
+                    s.sendto(msg, dest)
                 except OSError:
                     pass
                 self.stop_event.wait(OFFER_INTERVAL_SEC)
@@ -54,25 +59,23 @@ class OfferBroadcaster(threading.Thread):
 class ServerMain:
     def __init__(self, team_name: str):
         self.team_name = team_name
+        # wire form of the team name, encoded and padded once
+        self._team_name_b32 = Protocol.Protocol._fix_name(team_name)
         self.stop_event = threading.Event()
 
     def run(self) -> None:
         mode = self._choose_mode()
 
         # TCP listen
-        tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        tcp.bind(("", 0))
-        tcp.listen()
-        tcp.settimeout(1.0)
-        tcp_port = tcp.getsockname()[1]
+        listeners = self._open_listeners()
+        tcp_port = listeners[0].getsockname()[1]
 
         ip = get_local_ip()
         print(f"Server started, listening on IP address {ip} TCP port {tcp_port}")
         print(f"Mode: {mode}")
 
         # UDP offers
-        offer_thread = OfferBroadcaster(tcp_port, self.team_name, self.stop_event)
+        offer_thread = OfferBroadcaster(tcp_port, self._team_name_b32, self.stop_event)
         offer_thread.start()
 
         board = None
@@ -80,7 +83,30 @@ class ServerMain:
             board = OneBoard.OneBoard(self.team_name)
             threading.Thread(target=board.play_forever, daemon=True).start()
 
+        # pin each accept worker to a core; the handler threads it spawns inherit it
+        cpus = self._worker_cpus(len(listeners))
+        for i in range(1, len(listeners)):
+            threading.Thread(target=self._accept_loop, args=(listeners[i], mode, board, cpus[i]), daemon=True).start()
+
+        try:
+            self._accept_loop(listeners[0], mode, board, cpus[0])
+        except KeyboardInterrupt:
+            (board.log if board is not None else print)("\nShutting down...")
+        finally:
+            self.stop_event.set()
+            for tcp in listeners:
+                try:
+                    tcp.close()
+                except OSError:
+                    pass
+
+    def _accept_loop(self, tcp: socket.socket, mode: str, board: Optional["OneBoard.OneBoard"], cpu: Optional[int]) -> None:
+        # OneBoard logs from a background queue; go through it so lines stay in order
+        log = board.log if board is not None else print
         try:
+            if cpu is not None:
+                os.sched_setaffinity(0, {cpu})
+
             while not self.stop_event.is_set():
                 try:
                     conn, addr = tcp.accept()
@@ -89,23 +115,70 @@ class ServerMain:
                 except OSError:
                     break
 
-                if mode == "ONEBOARD":
-                    t = threading.Thread(target=self._handle_oneboard_join, args=(board, conn, addr), daemon=True)
-                    t.start()
-                else:
-                    session = GameSession.GameSession(conn, addr, self.team_name)
-                    t = threading.Thread(target=self._handle_session, args=(session,), daemon=True)
-                    t.start()
-
-        except KeyboardInterrupt:
-            print("\nShutting down...")
+                try:
+                    # blocking for the rest of its life, set once here instead of on every read
+                    conn.settimeout(None)
+                    # tiny request/response messages: don't let Nagle hold them back
+                    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+                    if mode == "ONEBOARD":
+                        t = threading.Thread(target=self._handle_oneboard_join, args=(board, conn, addr), daemon=True)
+                        t.start()
+                    else:
+                        session = GameSession.GameSession(conn, addr, self.team_name)
+                        t = threading.Thread(target=self._handle_session, args=(session,), daemon=True)
+                        t.start()
+                except (OSError, RuntimeError) as e:
+                    # one bad connection (e.g. reset before setup) must not take the worker down
+                    log(f"[ERROR] Failed to set up connection from {addr}: {e}")
+                    try:
+                        conn.close()
+                    except OSError:
+                        pass
         finally:
-            self.stop_event.set()
+            # a worker that stops must not leave its SO_REUSEPORT listener bound and undrained
             try:
                 tcp.close()
             except OSError:
                 pass
 
+    @staticmethod
+    def _new_listener(port: int, reuse_port: bool) -> socket.socket:
+        tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            tcp.bind(("", port))
+            tcp.listen()
+        except OSError:
+            tcp.close()
+            raise
+        tcp.settimeout(1.0)
+        return tcp
+
+    @staticmethod
+    def _open_listeners() -> List[socket.socket]:
+        # the first listener picks the port, the rest share it and the kernel spreads connections
+        reuse_port = hasattr(socket, "SO_REUSEPORT") and ACCEPT_WORKERS > 1
+        first = ServerMain._new_listener(0, reuse_port)
+        listeners = [first]
+        if reuse_port:
+            port = first.getsockname()[1]
+            try:
+                for _ in range(1, ACCEPT_WORKERS):
+                    listeners.append(ServerMain._new_listener(port, True))
+            except OSError:
+                pass  # fewer listeners, still serving
+        return listeners
+
+    @staticmethod
+    def _worker_cpus(n: int) -> List[Optional[int]]:
+        if n == 1 or not hasattr(os, "sched_setaffinity"):
+            return [None] * n
+        allowed = sorted(os.sched_getaffinity(0))
+        return [allowed[i % len(allowed)] for i in range(n)]
+
     @staticmethod
     def _choose_mode() -> str:
         while True:
@@ -127,9 +200,10 @@ class ServerMain:
     @staticmethod
     def _handle_oneboard_join(board: "OneBoard.OneBoard", conn: socket.socket, addr: Tuple[str, int]) -> None:
         try:
-            board.add_player(conn)
+            # the peer address from accept(), so joining needs no getpeername() call
+            board.add_player(conn, addr)
         except Exception as e:
-            print(f"[ERROR] OneBoard add_player crashed from {addr}: {e}")
+            board.log(f"[ERROR] OneBoard add_player crashed from {addr}: {e}")
             try:
                 conn.close()
             except OSError: